@@ -21,12 +21,14 @@
 
 import doctest
 import math
+import numpy as np
 import tqdm
 import timespan
 
 MAX_TEST_VAL = 1000000  # maximal value to test. its additive inverse number is the minimal value to test
 TEST_STEP = 0.987654321  # difference between consecutive test values. should be a number slightly less than 1.0
 TEST_PRECISION = 1e-6  # sufferable absolute difference of the required result when converting
+TEST_CHUNK = 10000  # number of values tested between progress bar updates
 
 
 def _test(start, stop, step):
@@ -36,22 +38,61 @@ def _test(start, stop, step):
 
     num_vals = int((stop - start) / step)
     stop = start + (num_vals + 1) * step
-    test_values = (start + i * step for i in range(num_vals))
+    test_values = np.arange(num_vals, dtype=np.float64) * step + start
 
     print(
         f"Testing {num_vals} values in range",
         f"{timespan.g(start)} : {timespan.g(stop)}",
         f"with specifiers {{c,g,G}}",
     )
-    for test_time in tqdm.tqdm(test_values, total=num_vals):
-        for timespan_ctor in (timespan.c, timespan.g, timespan.G):
-            string_from_float = timespan_ctor(test_time)
-            float_from_string = timespan.from_string(string_from_float).total_seconds()
-            assert math.isclose(test_time, float_from_string, abs_tol=TEST_PRECISION),\
-                (test_time, float_from_string, timespan_ctor.func.__name__)
+    ctors = (timespan.c, timespan.g, timespan.G)
+    from_string = timespan.from_string
+    isclose = math.isclose
+    with tqdm.tqdm(total=num_vals, miniters=TEST_CHUNK) as progress_bar:
+        for chunk_start in range(0, num_vals, TEST_CHUNK):
+            chunk = test_values[chunk_start:chunk_start + TEST_CHUNK].tolist()
+            for test_time in chunk:
+                for timespan_ctor in ctors:
+                    string_from_float = timespan_ctor(test_time)
+                    float_from_string = from_string(string_from_float).total_seconds()
+                    assert isclose(test_time, float_from_string, abs_tol=TEST_PRECISION),\
+                        (test_time, float_from_string, timespan_ctor.__name__)
+            progress_bar.update(len(chunk))
+    print("Test passed!")
+
+
+def _test_array(start, stop, step):
+    """
+    Test of the vectorized conversion, verifying it produces the same strings as the scalar one
+    """
+
+    num_vals = int((stop - start) / step)
+    test_values = np.arange(num_vals, dtype=np.float64) * step + start
+    test_values = np.concatenate((test_values, [0.0, -0.0, 1e-7, -1.5e-7, 0.99999999, 9e11, -9e11]))
+    # values beyond the int64 range of ticks take the scalar fallback, so they are tested separately
+    huge_values = np.array([1e12, -1e13])
+    # values beyond the TimeSpan range must be rejected like the scalar conversion does
+    out_of_range_values = (1e15, -1e15, 1e300)
+
+    print(f"Testing {len(test_values) + len(huge_values)} values with to_string_array and specifiers {{c,g,G}}")
+    for specifier in ('c', 'g', 'G'):
+        for values in (test_values, huge_values):
+            strings = timespan.to_string_array(specifier, values).tolist()
+            for test_time, string_from_array in zip(values.tolist(), strings):
+                string_from_float = timespan.to_string(specifier, test_time)
+                assert string_from_array == string_from_float, \
+                    (test_time, string_from_array, string_from_float, specifier)
+        for test_time in out_of_range_values:
+            try:
+                timespan.to_string_array(specifier, [0.0, test_time])
+            except OverflowError:
+                pass
+            else:
+                raise AssertionError((test_time, specifier))
     print("Test passed!")
 
 
 if __name__ == "__main__":
     doctest.testmod(timespan, verbose=True)
     _test(start=-MAX_TEST_VAL, stop=MAX_TEST_VAL, step=TEST_STEP)  # guarantees at least 2*MAX_TEST_VAL values were tested
+    _test_array(start=-MAX_TEST_VAL, stop=MAX_TEST_VAL, step=TEST_STEP)
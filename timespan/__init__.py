@@ -6,5 +6,5 @@ from timespan.asterisk import match, match_one
 
 # import api inspired by microsoft .net which lets you define time
 # deltas using a popular string syntax.
-from timespan.dotnet import to_string, from_string, total_seconds, \
-  c, constant, g, general_short, G, general_long
+from timespan.dotnet import to_string, to_string_array, from_string, total_seconds, \
+  c, constant, g, general_short, G, general_long, TimeSpanFormatter
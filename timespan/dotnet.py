@@ -23,7 +23,7 @@ import datetime
 import locale
 import os
 import re
-from functools import partial
+from functools import lru_cache
 
 __author__ = "Mattan Serry"
 __email__ = "maserry@microsoft.com"
@@ -95,24 +95,29 @@ Microsecond-level precision is guaranteed.
 """
 
 _TICKS_PER_SECOND = 1e7
-_PATTERN = re.compile(
-    r'^'
-    r'(?P<sign>-?)'
-    r'(?P<days>\d+[:.])?'
-    r'(?P<hours>\d{1,2}):'
-    r'(?P<minutes>\d{2}):'
-    r'(?P<seconds>\d{2})'
-    r'(?P<fraction>[.,]\d{1,7})?'
-    r'$'
-)
+_TICKS_PER_MINUTE = 600_000_000
+_TICKS_PER_HOUR = 36_000_000_000
+_TICKS_PER_DAY = 864_000_000_000
+# largest magnitude from_string can represent with either sign, i.e. 999999999 days (datetime.timedelta.min)
+_MAX_TICKS = -datetime.timedelta.min // datetime.timedelta(microseconds=1) * 10
 _FORMAT_SPECIFIERS = ('c', 'g', 'G')
+_timedelta = datetime.timedelta  # saves the attribute lookup on every parse
+
+
+def _read_decimal_separator() -> str:
+    """
+    @return: the decimal separator set by the TIMESPAN_LOCALE environment variable, or else by the current locale.
+    """
+    return os.environ.get("TIMESPAN_LOCALE", locale.localeconv()["decimal_point"])
+
+
 # Different locales use different decimal point characters. For example, en-US locale uses '.' and fr-FR locale uses ','
-_NUMBER_DECIMAL_SEPARATOR = os.environ.get("TIMESPAN_LOCALE", locale.localeconv()["decimal_point"])
+_NUMBER_DECIMAL_SEPARATOR = _read_decimal_separator()
 
 
 def _args_to_seconds(args, *, by_ticks=False) -> float:
     """
-    Converts a time information tuple to total seconds as float, passing through a timedelta object.
+    Converts a time information tuple to total seconds as float.
     @param args: variable-length tuple (size 1, 3, 4 or 5) specifying components of date and time.
     See the switch case of this function for full coverage of all input types.
     @param by_ticks: specifies input as ticks instead of seconds.
@@ -130,15 +135,14 @@ def _args_to_seconds(args, *, by_ticks=False) -> float:
 
     """
 
-    days, hours, minutes, seconds, milliseconds = 0, 0, 0, 0, 0
-
+    # the most common case, total seconds (or ticks) given as a single number
     if len(args) == 1:
         arg, = args
-        if by_ticks:
-            arg = arg / _TICKS_PER_SECOND
-        seconds = arg
+        return arg / _TICKS_PER_SECOND if by_ticks else float(arg)
 
-    elif len(args) == 3:
+    days, milliseconds = 0, 0
+
+    if len(args) == 3:
         # Initializes a new instance to a specified number of hours, minutes, and seconds.
         hours, minutes, seconds = args
 
@@ -152,13 +156,7 @@ def _args_to_seconds(args, *, by_ticks=False) -> float:
     else:
         raise ValueError(f"Cannot initialize a TimeSpan instance with {len(args)} arguments")
 
-    return datetime.timedelta(
-        days=days,
-        hours=hours,
-        minutes=minutes,
-        seconds=seconds,
-        milliseconds=milliseconds,
-    ).total_seconds()
+    return days * 86400.0 + hours * 3600.0 + minutes * 60.0 + float(seconds) + milliseconds * 1e-3
 
 
 def to_string(specifier: str, *args: tuple) -> str:
@@ -172,58 +170,322 @@ def to_string(specifier: str, *args: tuple) -> str:
     """
     assert specifier in _FORMAT_SPECIFIERS
 
-    # convert the date\time information tuple to total seconds as float
-    seconds: float = _args_to_seconds(args)
-
-    # break seconds to components
-    delta = datetime.timedelta(seconds=abs(seconds))
-    d = delta.days
-    h, remainder = divmod(delta.seconds, 3600)
-    m, s = divmod(remainder, 60)
-    f = delta.microseconds * 10
-
-    # apply format-specific style for hours, minutes and seconds
-    h = str(h).zfill(1 if specifier == 'g' else 2)
-    m = str(m).zfill(2)
-    s = str(s).zfill(2)
-
-    # apply format-specific style for fraction
-    if f > 0 or specifier == 'G':
-        f = ('.' if specifier == 'c' else _NUMBER_DECIMAL_SEPARATOR) + str(f).rjust(7, '0')
-        if specifier == 'g':
-            f = f.rstrip('0')
-    else:
-        f = ''
+    return _FORMATTERS[specifier].format(_args_to_seconds(args))
 
-    # apply format-specific style for days
-    if d > 0 or specifier == 'G':
-        d = str(d) + ('.' if specifier == 'c' else ':')
-    else:
-        d = ''
 
-    # build and return final string
-    sign = '-' if seconds < 0 else ''
-    return f"{sign}{d}{h}:{m}:{s}{f}"
+def _seconds_to_components(seconds: float) -> tuple:
+    """
+    Breaks total seconds to the components of a TimeSpan, using integer ticks throughout.
+    @param seconds: total seconds float.
+    @return: (negative, days, hours, minutes, seconds, fraction) tuple, with the fraction in ticks.
+
+    For example:
+    >>> _seconds_to_components(-93784.5)
+    (True, 1, 2, 3, 4, 5000000)
+    >>> _seconds_to_components(1e300)
+    Traceback (most recent call last):
+    ...
+    OverflowError: 1e+300 seconds is out of the TimeSpan range
+
+    """
+    negative = seconds < 0.0
+    ticks = round((-seconds if negative else seconds) * _TICKS_PER_SECOND)
+    if ticks > _MAX_TICKS:
+        raise OverflowError(f"{seconds} seconds is out of the TimeSpan range")
+    d, ticks = divmod(ticks, _TICKS_PER_DAY)
+    h, ticks = divmod(ticks, _TICKS_PER_HOUR)
+    m, ticks = divmod(ticks, _TICKS_PER_MINUTE)
+    s, f = divmod(ticks, 10_000_000)
+    return negative, d, h, m, s, f
+
+
+def to_string_array(specifier: str, seconds_array):
+    """
+    Converts an array of total seconds to an array of TimeSpan strings in the current locale.
+    Vectorized counterpart of to_string: the breakdown to components runs in NumPy,
+    leaving only the final string assembly to Python. Requires numpy.
+    @param specifier: format specifier. Options are 'c', 'g' and 'G'.
+    @param seconds_array: array-like of total seconds.
+    @return: NumPy object array of TimeSpan strings, shaped like the input.
+
+    For example:
+    >>> to_string_array('c', [1800, -0.5]).tolist()
+    ['00:30:00', '-00:00:00.5000000']
+    >>> to_string_array('c', [1e12]).tolist()
+    ['11574074.01:46:40']
+    >>> to_string_array('c', [1e12, 1e300])
+    Traceback (most recent call last):
+    ...
+    OverflowError: 1e+300 seconds is out of the TimeSpan range
+    >>> to_string_array('c', [float('nan')])
+    Traceback (most recent call last):
+    ...
+    ValueError: cannot convert float NaN to integer
+
+    """
+    import numpy as np
+
+    assert specifier in _FORMAT_SPECIFIERS
+
+    seconds = np.asarray(seconds_array, dtype=np.float64)
+
+    magnitude = np.abs(seconds) * _TICKS_PER_SECOND
+    if not np.all(magnitude < 2.0 ** 63):
+        # NaN, infinity or too many ticks for int64, leave it to the scalar path to format or raise
+        format_seconds = _FORMATTERS[specifier].format
+        strings = [format_seconds(value) for value in seconds.ravel().tolist()]
+        return np.array(strings, dtype=object).reshape(seconds.shape)
+
+    # break seconds to components, using integer ticks throughout
+    ticks = np.rint(magnitude).astype(np.int64)
+    d, ticks = np.divmod(ticks, _TICKS_PER_DAY)
+    h, ticks = np.divmod(ticks, _TICKS_PER_HOUR)
+    m, ticks = np.divmod(ticks, _TICKS_PER_MINUTE)
+    s, f = np.divmod(ticks, 10_000_000)
+
+    columns = (np.ravel(seconds < 0), d.ravel(), h.ravel(), m.ravel(), s.ravel(), f.ravel())
+    format_components = _COMPONENT_FORMATTERS[specifier]
+    separator = _NUMBER_DECIMAL_SEPARATOR
+    strings = [format_components(*fields, separator) for fields in zip(*(c.tolist() for c in columns))]
+    return np.array(strings, dtype=object).reshape(seconds.shape)
+
+
+# Each format specifier has its own specialized formatter, so no call branches on the specifier.
+# They take the output of _seconds_to_components and the decimal separator, and return the TimeSpan string.
+# Zero-padded hours, minutes and seconds come from a lookup table, which is much cheaper than a format spec.
+_TWO_DIGITS = tuple(f"{i:02d}" for i in range(60))
+
+
+def _format_constant(negative: bool, d: int, h: int, m: int, s: int, f: int, separator: str) -> str:
+    # [-][d'.']hh':'mm':'ss['.'fffffff], not culture-sensitive so the separator is ignored
+    sign = '-' if negative else ''
+    days = f"{d}." if d else ''
+    fraction = f".{f:07d}" if f else ''
+    return f"{sign}{days}{_TWO_DIGITS[h]}:{_TWO_DIGITS[m]}:{_TWO_DIGITS[s]}{fraction}"
+
+
+def _format_general_short(negative: bool, d: int, h: int, m: int, s: int, f: int, separator: str) -> str:
+    # [-][d':']h':'mm':'ss[.FFFFFFF]
+    sign = '-' if negative else ''
+    days = f"{d}:" if d else ''
+    fraction = f"{separator}{f:07d}".rstrip('0') if f else ''
+    return f"{sign}{days}{h}:{_TWO_DIGITS[m]}:{_TWO_DIGITS[s]}{fraction}"
+
+
+def _format_general_long(negative: bool, d: int, h: int, m: int, s: int, f: int, separator: str) -> str:
+    # [-]d':'hh':'mm':'ss.fffffff
+    sign = '-' if negative else ''
+    return f"{sign}{d}:{_TWO_DIGITS[h]}:{_TWO_DIGITS[m]}:{_TWO_DIGITS[s]}{separator}{f:07d}"
+
+
+_COMPONENT_FORMATTERS = {
+    'c': _format_constant,
+    'g': _format_general_short,
+    'G': _format_general_long,
+}
+
+
+class TimeSpanFormatter:
+    """
+    Converts total seconds to TimeSpan strings with a fixed format specifier.
+    Everything that depends on the specifier is resolved once at construction,
+    so reusing one instance is the cheapest way to format many values.
+
+    For example:
+    >>> formatter = TimeSpanFormatter('g', sep=',')
+    >>> formatter.format(93784.5)
+    '1:2:03:04,5'
+
+    """
+
+    def __init__(self, specifier: str, sep: str = None):
+        """
+        @param specifier: format specifier. Options are 'c', 'g' and 'G'.
+        @param sep: decimal separator. Defaults to the one of the current locale at formatting time.
+        """
+        assert specifier in _FORMAT_SPECIFIERS
+        self.specifier = specifier
+        self.sep = sep
+        self._format_components = _COMPONENT_FORMATTERS[specifier]
 
+    def format(self, seconds: float) -> str:
+        """
+        @param seconds: total seconds.
+        @return: TimeSpan string.
+        """
+        separator = _NUMBER_DECIMAL_SEPARATOR if self.sep is None else self.sep
+        return self._format_components(*_seconds_to_components(seconds), separator)
 
+    def __repr__(self):
+        return f"TimeSpanFormatter({self.specifier!r}, sep={self.sep!r})"
+
+
+# one formatter per specifier, following the current locale
+_FORMATTERS = {specifier: TimeSpanFormatter(specifier) for specifier in _FORMAT_SPECIFIERS}
+
+
+@lru_cache(maxsize=4096)
 def from_string(timespan_string: str) -> datetime.timedelta:
     """
     Converts a TimeSpan string in the current locale to a datetime.timedelta object.
     Analogous to TimeSpan.Parse - https://learn.microsoft.com/en-us/dotnet/api/system.timespan.parse?view=net-7.0
+    Results are memoized, which is safe since timedelta objects are immutable.
+    Use _from_string_impl to bypass the cache.
     @param timespan_string: TimeSpan string of any format and locale.
     @return: A timedelta object.
     See examples at module-level docs.
+
+    The fraction may use ',' whatever the current locale:
+    >>> from_string('1:02:03:04,5')
+    datetime.timedelta(days=1, seconds=7384, microseconds=500000)
+
+    """
+    return _from_string_impl(timespan_string)
+
+
+def _from_string_impl(timespan_string: str) -> datetime.timedelta:
+    """
+    Uncached implementation of from_string.
+
+    For example:
+    >>> _from_string_impl('1:2')
+    Traceback (most recent call last):
+    ...
+    ValueError: Invalid TimeSpan string: '1:2'
+
+    """
+
+    separator = _NUMBER_DECIMAL_SEPARATOR
+    fields = _parse_fast(timespan_string, separator)
+    if fields is None:
+        # not well-formed for the fast path, let the regular expression have the final word
+        match = _pattern_for(separator).match(timespan_string)
+        if match is None:
+            raise ValueError(f"Invalid TimeSpan string: {timespan_string!r}")
+        fields = match.groups()
+
+    sign_str, days_str, hours_str, minutes_str, seconds_str, fraction_str = fields
+    days = int(days_str or '0')
+    hours = int(hours_str)
+    minutes = int(minutes_str)
+    seconds = int(seconds_str)
+    # the fraction has up to 7 digits (ticks), rounded half to even to microseconds like timedelta does
+    fraction_ticks = int(fraction_str[1:].ljust(7, '0')) if fraction_str else 0
+
+    # sum up in integer microseconds, so no float rounding is involved
+    microseconds = (days * 86_400_000_000 + hours * 3_600_000_000 + minutes * 60_000_000
+                    + seconds * 1_000_000 + round(fraction_ticks / 10))
+    if sign_str == '-':
+        microseconds = -microseconds
+    return _timedelta(microseconds=microseconds)
+
+
+def _is_digits(text: str) -> bool:
+    return text.isdigit() and text.isascii()
+
+
+def _refresh_locale() -> str:
+    """
+    Re-reads the decimal separator of the current locale, e.g. after a call to locale.setlocale.
+    Conversions never call the costly locale.localeconv themselves, they use the separator cached here.
+    @return: the new decimal separator.
+
+    For example:
+    >>> original = os.environ.get("TIMESPAN_LOCALE")
+    >>> os.environ["TIMESPAN_LOCALE"] = ','
+    >>> _refresh_locale()
+    ','
+    >>> g(1.5)
+    '0:00:01,5'
+    >>> from_string('0:00:01,5')
+    datetime.timedelta(seconds=1, microseconds=500000)
+    >>> if original is None:
+    ...     del os.environ["TIMESPAN_LOCALE"]
+    ... else:
+    ...     os.environ["TIMESPAN_LOCALE"] = original
+    >>> _refresh_locale() == _read_decimal_separator()
+    True
+    >>> from_string.cache_info().currsize
+    0
+
+    """
+    global _NUMBER_DECIMAL_SEPARATOR
+    _NUMBER_DECIMAL_SEPARATOR = _read_decimal_separator()
+    # parsing results depend on which separators are accepted
+    from_string.cache_clear()
+    return _NUMBER_DECIMAL_SEPARATOR
+
+
+@lru_cache(maxsize=8)
+def _pattern_for(separator: str) -> re.Pattern:
+    """
+    Compiles the TimeSpan regular expression for a decimal separator.
+    The fraction accepts '.' (used by the invariant 'c' format), ',' and the given separator,
+    so strings from any locale parse.
+    @param separator: decimal separator of the locale.
+    @return: compiled regular expression.
+    """
+    fraction_separators = re.escape(''.join(sorted({'.', ',', separator})))
+    # numbered groups: sign, days, hours, minutes, seconds, fraction
+    return re.compile(
+        r'^'
+        r'(-?)'
+        r'(?:(\d+)[:.])?'
+        r'(\d{1,2}):'
+        r'(\d{2}):'
+        r'(\d{2})'
+        rf'([{fraction_separators}]\d{{1,7}})?'
+        r'$'
+    )
+
+
+def _parse_fast(timespan_string: str, separator: str):
     """
+    Splits a TimeSpan string into its fields by index, without going through the regex engine.
+    @param timespan_string: TimeSpan string of any format and locale.
+    @param separator: decimal separator of the locale.
+    @return: (sign, days, hours, minutes, seconds, fraction) strings, same as the groups of _pattern_for,
+    or None if the string is not well-formed.
+
+    For example:
+    >>> _parse_fast('-3.17:25:30.5000000', '.')
+    ('-', '3', '17', '25', '30', '.5000000')
+    >>> _parse_fast('1:3:16:50', '.')
+    ('', '1', '3', '16', '50', None)
+    >>> _parse_fast('1:3:16:50,5', ',')
+    ('', '1', '3', '16', '50', ',5')
+    >>> _parse_fast('3:16:50,5', ',')
+    ('', None, '3', '16', '50', ',5')
+    >>> _parse_fast('1.02:03:04,5', ',')
+    ('', '1', '02', '03', '04', ',5')
+    >>> _parse_fast('1:3:16', '.') is None
+    True
+
+    """
+    sign = '-' if timespan_string[:1] == '-' else ''
+    parts = timespan_string[len(sign):].split(':')
+    if len(parts) == 4:
+        # [d':']h':'mm':'ss
+        days, hours, minutes, rest = parts
+        if not _is_digits(days):
+            return None
+    elif len(parts) == 3:
+        # [d'.']hh':'mm':'ss
+        hours, minutes, rest = parts
+        days, day_separator, hours = hours.rpartition('.')
+        if day_separator and not _is_digits(days):
+            return None
+    else:
+        return None
 
-    groups = _PATTERN.match(timespan_string).groupdict()
-    sign = -1 if groups['sign'] == '-' else 1
-    days = sign * int((groups['days'] or '0').rstrip(':.'))
-    hours = sign * int(groups['hours'])
-    minutes = sign * int(groups['minutes'])
-    seconds = sign * int(groups['seconds'])
-    fraction = sign * float(groups['fraction'] or 0.0)
-    delta = datetime.timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds + fraction)
-    return delta
+    seconds, fraction = rest[:2], rest[2:]
+    if not (0 < len(hours) <= 2 and len(minutes) == 2 and len(seconds) == 2
+            and _is_digits(hours) and _is_digits(minutes) and _is_digits(seconds)):
+        return None
+    if fraction and not (fraction[0] in ('.', ',', separator) and len(fraction) <= 8 and _is_digits(fraction[1:])):
+        return None
+
+    return sign, days or None, hours, minutes, seconds, fraction or None
 
 
 def total_seconds(timespan_string: str) -> float:
@@ -241,9 +503,26 @@ def total_seconds(timespan_string: str) -> float:
     return seconds
 
 
-constant = partial(to_string, 'c')
-general_short = partial(to_string, 'g')
-general_long = partial(to_string, 'G')
+def constant(*args: tuple) -> str:
+    """
+    Same as to_string('c', *args), without dispatching on the specifier.
+    """
+    return _format_constant(*_seconds_to_components(_args_to_seconds(args)), _NUMBER_DECIMAL_SEPARATOR)
+
+
+def general_short(*args: tuple) -> str:
+    """
+    Same as to_string('g', *args), without dispatching on the specifier.
+    """
+    return _format_general_short(*_seconds_to_components(_args_to_seconds(args)), _NUMBER_DECIMAL_SEPARATOR)
+
+
+def general_long(*args: tuple) -> str:
+    """
+    Same as to_string('G', *args), without dispatching on the specifier.
+    """
+    return _format_general_long(*_seconds_to_components(_args_to_seconds(args)), _NUMBER_DECIMAL_SEPARATOR)
+
 
 c = constant
 g = general_short